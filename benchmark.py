@@ -77,9 +77,11 @@ def benchmark_read(csv_text, reader_class, iterations=5):
     """
     times = []
     for _ in range(iterations):
+        # Build the input outside the timed region so that copying the
+        # text into a StringIO is not counted as parsing time
+        file_obj = StringIO(csv_text)
         start = timeit.default_timer()
         
-        file_obj = StringIO(csv_text)
         reader = reader_class(file_obj)
         rows = list(reader)
         
@@ -4,89 +4,230 @@ This module provides custom CSV reader and writer classes that implement
 CSV parsing from scratch without relying on Python's built-in csv module.
 """
 
+# Number of rows CustomCsvWriter.writerows formats before each write call
+WRITE_BATCH_ROWS = 1024
+
 
 class CustomCsvReader:
-    """A custom CSV reader that parses CSV files character-by-character.
+    """A custom CSV reader that parses CSV files with a small state machine.
     
     Implements the iterator protocol to yield rows as lists of strings.
     Handles quoted fields, escaped quotes, and embedded newlines.
     """
     
-    def __init__(self, fileobj, delimiter=',', quotechar='"'):
+    def __init__(self, fileobj, delimiter=',', quotechar='"',
+                 read_size=65536):
         """Initialize the CSV reader.
         
         Args:
-            fileobj: File object opened in text mode
+            fileobj: File object opened in text mode, or the CSV text
+                itself as a string
             delimiter: Field separator (default: ',')
             quotechar: Quote character (default: '"')
+            read_size: Number of characters requested from fileobj per
+                read call (default: 65536)
+        
+        Raises:
+            ValueError: If read_size is less than 1
         """
+        if read_size < 1:
+            raise ValueError("read_size must be at least 1")
         self.fileobj = fileobj
         self.delimiter = delimiter
         self.quotechar = quotechar
-        self.buffer = ""
+        self.read_size = read_size
+        self.buf = ""
+        self.pos = 0
+        # Position of the next newline in buf (or len(buf) if there is
+        # none); a value below pos means it has to be searched for again
+        self._end = -1
         self.eof = False
+        if isinstance(fileobj, str):
+            # Parse in-memory text directly instead of reading it back
+            self.fileobj = None
+            self.buf = fileobj
+            self.eof = True
     
     def __iter__(self):
         """Return the iterator object (self)."""
         return self
     
+    def _fill(self):
+        """Read the next chunk, keeping the unconsumed tail of the buffer.
+        
+        Returns:
+            bool: False if the end of the file has been reached
+        """
+        if self.eof:
+            return False
+        chunk = self.fileobj.read(self.read_size)
+        if not chunk:
+            self.eof = True
+            return False
+        self.buf = self.buf[self.pos:] + chunk
+        self.pos = 0
+        self._end = -1
+        return True
+    
     def __next__(self):
         """Parse and return the next row as a list of strings.
         
+        Instead of stepping through the buffer one character at a time,
+        each state jumps straight to the next character it cares about
+        with str.find. Inside quotes the run in between is copied as a
+        single slice; outside quotes it is split on the delimiter with a
+        single str.split call.
+        
         Raises:
             StopIteration: When end of file is reached
         """
-        if self.eof and not self.buffer:
+        if self.pos >= len(self.buf) and not self._fill():
             raise StopIteration
         
+        delimiter = self.delimiter
+        quotechar = self.quotechar
+        buf = self.buf
+        pos = self.pos
+        end = self._end
         row = []
-        current_field = ""
+        parts = []
         in_quotes = False
         
         while True:
-            # Read character by character
-            if not self.buffer:
-                chunk = self.fileobj.read(4096)
-                if not chunk:
-                    self.eof = True
-                    if current_field or in_quotes:
-                        row.append(current_field)
-                    if row:
+            if in_quotes:
+                stop = buf.find(quotechar, pos)
+                if stop == -1:
+                    # The whole remaining buffer belongs to the field
+                    parts.append(buf[pos:])
+                    self.pos = len(buf)
+                    if not self._fill():
+                        row.append("".join(parts))
                         return row
-                    raise StopIteration
-                self.buffer = chunk
+                    buf = self.buf
+                    pos = 0
+                    end = -1
+                    continue
+                if stop + 1 == len(buf) and not self.eof:
+                    # Need the next character to tell "" from a closing quote
+                    parts.append(buf[pos:stop])
+                    self.pos = stop
+                    self._fill()
+                    buf = self.buf
+                    pos = self.pos
+                    end = -1
+                    continue
+                parts.append(buf[pos:stop])
+                # Check for escaped quote
+                if buf.startswith(quotechar, stop + 1):
+                    parts.append(quotechar)
+                    pos = stop + 2
+                    continue
+                pos = stop + 1
+                # A closing quote is usually followed straight by a
+                # delimiter or a newline, so handle those without
+                # scanning the rest of the row
+                if buf.startswith(delimiter, pos):
+                    row.append("".join(parts))
+                    parts.clear()
+                    pos += 1
+                    if buf.startswith(quotechar, pos):
+                        # The next field is quoted as well
+                        pos += 1
+                        continue
+                elif buf.startswith('\n', pos):
+                    row.append("".join(parts))
+                    self.pos = pos + 1
+                    return row
+                in_quotes = False
+                continue
+            
+            if end < pos:
+                end = buf.find('\n', pos)
+                if end == -1:
+                    end = len(buf)
+                self._end = end
+            stop = end
+            for special in ('\r', quotechar):
+                found = buf.find(special, pos, stop)
+                if found != -1:
+                    stop = found
             
-            char = self.buffer[0]
-            self.buffer = self.buffer[1:]
+            # Everything up to stop is plain text, so split it in one go
+            fields = buf[pos:stop].split(delimiter)
+            if parts:
+                parts.append(fields[0])
+                fields[0] = "".join(parts)
+                parts.clear()
             
+            if stop == len(buf):
+                # Nothing special left in the buffer
+                parts.append(fields.pop())
+                row.extend(fields)
+                self.pos = stop
+                if not self._fill():
+                    row.append("".join(parts))
+                    return row
+                buf = self.buf
+                pos = 0
+                end = -1
+                continue
+            
+            char = buf[stop]
             # Handle quote character
-            if char == self.quotechar:
-                if in_quotes:
-                    # Check for escaped quote
-                    if self.buffer and self.buffer[0] == self.quotechar:
-                        current_field += self.quotechar
-                        self.buffer = self.buffer[1:]
-                    else:
-                        in_quotes = False
-                else:
-                    in_quotes = True
-            # Handle delimiter
-            elif char == self.delimiter and not in_quotes:
-                row.append(current_field)
-                current_field = ""
+            if char == quotechar:
+                parts.append(fields.pop())
+                row.extend(fields)
+                in_quotes = True
+                pos = stop + 1
+                continue
+            if char == '\r' and stop + 1 == len(buf) and not self.eof:
+                # Need the next character to spot a CRLF pair
+                parts.append(fields.pop())
+                row.extend(fields)
+                self.pos = stop
+                self._fill()
+                buf = self.buf
+                pos = self.pos
+                end = -1
+                continue
             # Handle newline (end of row)
-            elif char in ('\n', '\r') and not in_quotes:
-                row.append(current_field)
-                # Handle CRLF
-                if char == '\r' and self.buffer and self.buffer[0] == '\n':
-                    self.buffer = self.buffer[1:]
-                return row
-            else:
-                current_field += char
+            row.extend(fields)
+            pos = stop + 1
+            # Handle CRLF
+            if char == '\r' and buf.startswith('\n', pos):
+                pos += 1
+            self.pos = pos
+            return row
     
     def read(self):
-        """Read all remaining rows and return them as a list."""
-        return list(self)
+        """Read all remaining rows and return them as a list.
+        
+        The rest of the file is read in one go. If it holds no quote
+        character, the rows are produced by splitting it into lines and
+        each line on the delimiter, without running the state machine.
+        """
+        text = self.buf[self.pos:]
+        if not self.eof:
+            text += self.fileobj.read()
+            self.eof = True
+        if self.quotechar in text:
+            self.buf = text
+            self.pos = 0
+            self._end = -1
+            return list(self)
+        
+        self.buf = ""
+        self.pos = 0
+        self._end = -1
+        if '\r' in text:
+            # Outside quotes, CRLF and a lone CR both end a row
+            text = text.replace('\r\n', '\n').replace('\r', '\n')
+        lines = text.split('\n')
+        if not lines[-1]:
+            # Drop the empty remainder after the final line break
+            lines.pop()
+        delimiter = self.delimiter
+        return [line.split(delimiter) for line in lines]
 
 
 class CustomCsvWriter:
@@ -107,39 +248,36 @@ class CustomCsvWriter:
         self.delimiter = delimiter
         self.quotechar = quotechar
     
-    def _needs_quoting(self, field):
-        """Check if a field needs to be quoted.
+    def _format_row(self, row):
+        """Format a single row as a CSV line, including the line terminator.
         
-        A field needs quoting if it contains:
+        A field is quoted if it contains:
         - The delimiter
         - The quote character
         - Newline characters
         
-        Args:
-            field: String field to check
-            
-        Returns:
-            bool: True if field needs quoting, False otherwise
-        """
-        return (self.delimiter in field or 
-                self.quotechar in field or 
-                '\n' in field or 
-                '\r' in field)
-    
-    def _escape_field(self, field):
-        """Escape and quote a field if necessary.
+        Only fields that contain the quote character go through the
+        replace call; other quoted fields are wrapped as they are.
         
         Args:
-            field: String field to escape
+            row: List of fields (strings or convertible to strings)
             
         Returns:
-            str: Properly escaped field
+            str: The escaped fields joined by the delimiter, plus a newline
         """
-        if self._needs_quoting(field):
-            # Escape quotes by doubling them
-            escaped = field.replace(self.quotechar, self.quotechar + self.quotechar)
-            return self.quotechar + escaped + self.quotechar
-        return field
+        delimiter = self.delimiter
+        quotechar = self.quotechar
+        escaped_fields = []
+        for value in row:
+            field = str(value)
+            if quotechar in field:
+                # Escape quotes by doubling them
+                escaped = field.replace(quotechar, quotechar + quotechar)
+                field = quotechar + escaped + quotechar
+            elif delimiter in field or '\n' in field or '\r' in field:
+                field = quotechar + field + quotechar
+            escaped_fields.append(field)
+        return delimiter.join(escaped_fields) + '\n'
     
     def writerow(self, row):
         """Write a single row to the CSV file.
@@ -147,16 +285,22 @@ class CustomCsvWriter:
         Args:
             row: List of fields (strings or convertible to strings)
         """
-        # Convert all fields to strings and escape them
-        escaped_fields = [self._escape_field(str(field)) for field in row]
-        line = self.delimiter.join(escaped_fields) + '\n'
-        self.fileobj.write(line)
+        self.fileobj.write(self._format_row(row))
     
     def writerows(self, rows):
         """Write multiple rows to the CSV file.
         
+        Rows are formatted in batches and each batch is handed to the
+        file object in a single write call.
+        
         Args:
             rows: List of rows, where each row is a list of fields
         """
+        lines = []
         for row in rows:
-            self.writerow(row)
+            lines.append(self._format_row(row))
+            if len(lines) >= WRITE_BATCH_ROWS:
+                self.fileobj.write(''.join(lines))
+                lines.clear()
+        if lines:
+            self.fileobj.write(''.join(lines))